@@ -1,5 +1,7 @@
 import os
 import json
+import time
+from typing import Optional
 from dotenv import load_dotenv
 from google import genai
 from google.genai import types
@@ -15,27 +17,46 @@ class GeminiOPMAgent:
         - Load OPM rules once.
         - Send diagrams and generate code.
         - Refine code based on instructions.
+        - Account for the input tokens of every prompt component.
     """
-    def __init__(self):
+    def __init__(self, system_prompt: str = OPM_SYSTEM_PROMPT, knowledge_files: Optional[dict] = None, client=None):
         """
         Initializes the Gemini client and uploads the OPM knowledge base files once.
+
+        Args:
+            system_prompt: The system prompt sent with every call.
+            knowledge_files: {display_name: pdf_path} of the knowledge sources (default: Manual + Lecture).
+            client: Gemini client to use (default: a real client; ai/prompt_eval.py passes a stub).
         """
-        self.client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+        self.client = client or genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
         self.model_id = "gemini-2.5-flash-lite"  # Efficient and free-tier friendly
 
+        if knowledge_files is None:
+            knowledge_files = {"OPM_Manual": opm_manual_pdf_path, "OPM_Lecture": opm_lecture_pdf_path}
+
         # Validate paths
-        for path in [opm_manual_pdf_path, opm_lecture_pdf_path]:
+        for path in knowledge_files.values():
             if not os.path.exists(path):
                 raise FileNotFoundError(f"Knowledge file not found at {path}")
 
-        # Upload BOTH knowledge sources, we store them in a list to pass to every prompt
+        # Upload the knowledge sources, we store them in a list to pass to every prompt
         self.knowledge_base = [
-            self.client.files.upload(file=opm_manual_pdf_path, config={'display_name': 'OPM_Manual'}),
-            self.client.files.upload(file=opm_lecture_pdf_path, config={'display_name': 'OPM_Lecture'})
+            self.client.files.upload(file=path, config={'display_name': display_name})
+            for display_name, path in knowledge_files.items()
         ]
 
         # The system prompt
-        self.opm_system_prompt = OPM_SYSTEM_PROMPT
+        self.opm_system_prompt = system_prompt
+
+        # Knowledge base and system prompt are the same on every call, so count them once
+        self.static_token_counts = {
+            display_name: self._count_tokens([uploaded_file])
+            for display_name, uploaded_file in zip(knowledge_files, self.knowledge_base)
+        }
+        self.static_token_counts["system_prompt"] = self._count_tokens([self.opm_system_prompt])
+
+        # Generation instructions only depend on the target language, so their counts are cached
+        self._instruction_token_counts: dict = {}
 
 
     def _empty_invalid_response(self, msg: str) -> dict:
@@ -43,17 +64,85 @@ class GeminiOPMAgent:
         return {"status": "invalid", "code": "", "explanation": msg}
 
 
-    def _call_gemini(self, contents: list) -> dict:
-        """Internal helper: calls Gemini and ensures valid JSON output."""
+    def _count_tokens(self, contents: list) -> Optional[int]:
+        """Internal helper: counts input tokens of contents, None if counting fails."""
+        try:
+            return self.client.models.count_tokens(model=self.model_id, contents=contents).total_tokens
+        except Exception:
+            return None
+
+
+    def _token_usage(self, instructions: str, cache_instructions: bool = False) -> dict:
+        """
+        Internal helper: counts input tokens per prompt component before a call.
+
+        The diagram is not counted here, that would upload the whole PDF a second time.
+        Its count is derived from the billed prompt tokens once the model answered.
+
+        Args:
+            instructions: The text part of the request.
+            cache_instructions: Reuse earlier counts of the same text (for the per-language generation text).
+
+        Returns:
+            {
+                "components": {<knowledge file>: n, ..., "system_prompt": n, "diagram": None, "instructions": n},
+                "prompt_tokens": None (filled in from the response),
+                "output_tokens": None (filled in from the response),
+                "latency_ms": None (duration of the model call only, without token counting)
+            }
+        """
+        if not cache_instructions:
+            instruction_tokens = self._count_tokens([instructions])
+        elif instructions in self._instruction_token_counts:
+            instruction_tokens = self._instruction_token_counts[instructions]
+        else:
+            instruction_tokens = self._count_tokens([instructions])
+            if instruction_tokens is not None:
+                self._instruction_token_counts[instructions] = instruction_tokens
+
+        components = dict(self.static_token_counts)
+        components["diagram"] = None
+        components["instructions"] = instruction_tokens
+        return {"components": components, "prompt_tokens": None, "output_tokens": None, "latency_ms": None}
+
+
+    def _derive_diagram_tokens(self, token_usage: dict):
+        """Internal helper: diagram tokens = billed prompt tokens - every other counted component."""
+        other_counts = [count for name, count in token_usage["components"].items() if name != "diagram"]
+        if token_usage["prompt_tokens"] is not None and None not in other_counts:
+            token_usage["components"]["diagram"] = token_usage["prompt_tokens"] - sum(other_counts)
+
+
+    def _call_gemini(self, contents: list, token_usage: dict) -> dict:
+        """
+        Internal helper: calls Gemini and ensures valid JSON output.
+
+        The returned dict always contains "token_usage", with the billed prompt/output
+        token counts and the model call latency added when the model answered.
+        """
+        result: dict = self._parse_gemini_response(contents, token_usage)
+        result["token_usage"] = token_usage
+        return result
+
+
+    def _parse_gemini_response(self, contents: list, token_usage: dict) -> dict:
+        """Internal helper: sends contents to Gemini and validates the JSON it returns."""
         try:
+            start = time.perf_counter()
             response = self.client.models.generate_content(
                 model=self.model_id,
                 contents=contents,
                 config=types.GenerateContentConfig(response_mime_type="application/json")
             )
+            token_usage["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
         except Exception as e:
             return self._empty_invalid_response(f"API call failed: {e}")
 
+        if response.usage_metadata:
+            token_usage["prompt_tokens"] = response.usage_metadata.prompt_token_count
+            token_usage["output_tokens"] = response.usage_metadata.candidates_token_count
+            self._derive_diagram_tokens(token_usage)
+
         try:
             result: dict = json.loads(response.text)
         except json.JSONDecodeError:
@@ -80,15 +169,17 @@ class GeminiOPMAgent:
                 "status": "valid" | "invalid",
                 "explanation": "human-readable explanation",
                 "code": "generated code skeleton" (only if valid),
+                "token_usage": input tokens per prompt component + billed token counts
             }
         """
+        instructions = f"Target Programming Language: {target_language}"
         contents = [
             *self.knowledge_base,  # Manual + Lecture
             self.opm_system_prompt,
             types.Part.from_bytes(data=pdf_bytes, mime_type="application/pdf"),
-            f"Target Programming Language: {target_language}"
+            instructions
         ]
-        return self._call_gemini(contents)
+        return self._call_gemini(contents, self._token_usage(instructions, cache_instructions=True))
 
 
     def refine_generated_code(self, pdf_bytes: bytes, target_language: str, previous_code: str, fix_instructions: str) -> dict:
@@ -105,7 +196,8 @@ class GeminiOPMAgent:
             {
                 "status": "valid" | "invalid",
                 "code": "refined code skeleton" (only if valid),
-                "explanation": "human-readable explanation"
+                "explanation": "human-readable explanation",
+                "token_usage": input tokens per prompt component + billed token counts
             }
         """
         refinement_context = f"""
@@ -122,4 +214,4 @@ class GeminiOPMAgent:
             types.Part.from_bytes(data=pdf_bytes, mime_type="application/pdf"),
             refinement_context
         ]
-        return self._call_gemini(contents)
\ No newline at end of file
+        return self._call_gemini(contents, self._token_usage(refinement_context))
\ No newline at end of file
@@ -0,0 +1,257 @@
+"""
+Offline evaluation harness for OPM prompt variants.
+
+Runs every prompt variant over a fixed corpus of OPM PDFs and compares input tokens,
+latency and the valid/invalid outcome, so the cheapest prompt that keeps accuracy can be shipped.
+
+Corpus layout (default: backend/eval_corpus):
+    <corpus_dir>/*.pdf           OPM diagrams
+    <corpus_dir>/expected.json   optional, {"<file>.pdf": "valid" | "invalid"}
+
+Variants change one thing at a time: the knowledge files (full lecture, no lecture, lecture excerpt)
+are each paired with both the full and the compact system prompt.
+
+Usage (from the backend directory):
+    python -m ai.prompt_eval --output results.json      # real Gemini, records results
+    python -m ai.prompt_eval --stub                     # stubbed model, no API key needed
+    python -m ai.prompt_eval --replay results.json      # report on recorded results
+"""
+import argparse
+import json
+import os
+import re
+import tempfile
+from types import SimpleNamespace
+from typing import Optional
+
+from definitions import opm_manual_pdf_path, opm_lecture_pdf_path, eval_corpus_path
+from ai.prompts import OPM_SYSTEM_PROMPT, OPM_SYSTEM_PROMPT_COMPACT
+
+
+# CONSTANTS
+# 1-based lecture slides on links, conditions/events and In-Zoom/Unfold, without the worked examples
+LECTURE_EXCERPT_PAGES = (11, 12, 13, 16, 17, 20, 21, 22, 23, 24, 25)
+LECTURE_EXCERPT_PDF_PATH = os.path.join(tempfile.gettempdir(), "OPM Lecture Excerpt.pdf")
+
+KNOWLEDGE_FILE_SETS: dict = {
+    "": {"OPM_Manual": opm_manual_pdf_path, "OPM_Lecture": opm_lecture_pdf_path},
+    "manual_only": {"OPM_Manual": opm_manual_pdf_path},
+    "lecture_excerpt": {"OPM_Manual": opm_manual_pdf_path, "OPM_Lecture_Excerpt": LECTURE_EXCERPT_PDF_PATH}
+}
+SYSTEM_PROMPTS: dict = {"baseline": OPM_SYSTEM_PROMPT, "compact": OPM_SYSTEM_PROMPT_COMPACT}
+
+# baseline, compact, baseline_manual_only, compact_manual_only, baseline_lecture_excerpt, compact_lecture_excerpt
+PROMPT_VARIANTS: dict = {
+    "_".join(filter(None, [prompt_name, files_name])): {
+        "system_prompt": system_prompt,
+        "knowledge_files": knowledge_files
+    }
+    for files_name, knowledge_files in KNOWLEDGE_FILE_SETS.items()
+    for prompt_name, system_prompt in SYSTEM_PROMPTS.items()
+}
+TOKENS_PER_PDF_PAGE = 258  # Gemini bills every PDF page as one image
+CHARS_PER_TEXT_TOKEN = 4
+
+
+# STUBBED MODEL
+def estimate_pdf_tokens(pdf_bytes: bytes) -> int:
+    """Estimates Gemini input tokens of a PDF from its page count."""
+    pages = len(re.findall(rb"/Type\s*/Page(?!s)", pdf_bytes))
+    return max(pages, 1) * TOKENS_PER_PDF_PAGE
+
+
+def estimate_tokens(item) -> int:
+    """Estimates Gemini input tokens of one content item (text, inline PDF part or uploaded file)."""
+    if isinstance(item, str):
+        return len(item) // CHARS_PER_TEXT_TOKEN
+    if getattr(item, "inline_data", None):
+        return estimate_pdf_tokens(item.inline_data.data)
+    with open(item.path, "rb") as f:
+        return estimate_pdf_tokens(f.read())
+
+
+class StubGeminiClient:
+    """
+    Offline stand-in for genai.Client, implementing only what GeminiOPMAgent uses.
+
+    Token counts are estimated locally and every diagram is answered as valid, so the stub
+    measures prompt cost and exercises the pipeline, but says nothing about accuracy.
+    """
+    def __init__(self):
+        self.files = SimpleNamespace(upload=self._upload)
+        self.models = SimpleNamespace(count_tokens=self._count_tokens, generate_content=self._generate_content)
+
+    @staticmethod
+    def _upload(file: str, config: dict):
+        return SimpleNamespace(path=file, display_name=config["display_name"])
+
+    @staticmethod
+    def _count_tokens(model: str, contents: list):
+        return SimpleNamespace(total_tokens=sum(estimate_tokens(item) for item in contents))
+
+    @staticmethod
+    def _generate_content(model: str, contents: list, config):
+        return SimpleNamespace(
+            text=json.dumps({"status": "valid", "code": "", "explanation": "Stubbed response."}),
+            usage_metadata=SimpleNamespace(
+                prompt_token_count=sum(estimate_tokens(item) for item in contents),
+                candidates_token_count=0
+            )
+        )
+
+
+# HELPER FUNCTIONS
+def build_lecture_excerpt() -> str:
+    """
+    Writes LECTURE_EXCERPT_PAGES of the OPM Lecture to LECTURE_EXCERPT_PDF_PATH.
+
+    :return: Path of the excerpt PDF
+    """
+    # Imported here, only the lecture excerpt variants need pypdf
+    from pypdf import PdfReader, PdfWriter
+
+    lecture = PdfReader(opm_lecture_pdf_path)
+    excerpt = PdfWriter()
+    for page_number in LECTURE_EXCERPT_PAGES:
+        excerpt.add_page(lecture.pages[page_number - 1])
+
+    with open(LECTURE_EXCERPT_PDF_PATH, "wb") as f:
+        excerpt.write(f)
+    return LECTURE_EXCERPT_PDF_PATH
+
+
+def load_corpus(corpus_dir: str) -> list:
+    """
+    Loads the evaluation corpus.
+
+    :param corpus_dir: Directory with OPM PDFs and an optional expected.json
+    :return: List of {"pdf_filename", "pdf_bytes", "expected"} sorted by filename
+    """
+    expected_path = os.path.join(corpus_dir, "expected.json")
+    expected: dict = {}
+    if os.path.exists(expected_path):
+        with open(expected_path) as f:
+            expected = json.load(f)
+
+    corpus = []
+    for filename in sorted(os.listdir(corpus_dir)):
+        if filename.lower().endswith(".pdf"):
+            with open(os.path.join(corpus_dir, filename), "rb") as f:
+                corpus.append({"pdf_filename": filename, "pdf_bytes": f.read(), "expected": expected.get(filename)})
+
+    if not corpus:
+        raise FileNotFoundError(f"No PDF files found in {corpus_dir}")
+    return corpus
+
+
+def run_variant(variant_name: str, corpus: list, target_language: str, client=None) -> list:
+    """
+    Runs one prompt variant over the whole corpus.
+
+    :param variant_name: Key of PROMPT_VARIANTS
+    :param corpus: Output of load_corpus
+    :param target_language: Programming language to generate (python/java/csharp/cpp)
+    :param client: Gemini client to use (None for the real one)
+    :return: One result row per corpus PDF
+    """
+    # Imported here so --replay works without the google-genai package
+    from ai.gemini_agent import GeminiOPMAgent
+
+    variant = PROMPT_VARIANTS[variant_name]
+    agent = GeminiOPMAgent(
+        system_prompt=variant["system_prompt"],
+        knowledge_files=variant["knowledge_files"],
+        client=client
+    )
+
+    rows = []
+    for item in corpus:
+        result = agent.generate_code_from_diagram(pdf_bytes=item["pdf_bytes"], target_language=target_language)
+
+        rows.append({
+            "variant": variant_name,
+            "pdf_filename": item["pdf_filename"],
+            "expected": item["expected"],
+            "status": result["status"],
+            "stubbed": isinstance(client, StubGeminiClient),  # stubbed outcomes say nothing about accuracy
+            "token_usage": result["token_usage"]  # includes latency_ms of the model call only
+        })
+    return rows
+
+
+def counted_input_tokens(row: dict) -> Optional[int]:
+    """Sum of the per-component token counts of a row, None if any component could not be counted."""
+    counts = row["token_usage"]["components"].values()
+    return None if None in counts else sum(counts)
+
+
+def summarize(rows: list) -> dict:
+    """
+    Aggregates result rows per variant.
+
+    :return: {variant: {"runs", "valid", "correct", "accuracy", "avg_input_tokens", "avg_prompt_tokens", "avg_latency_ms"}}
+             "correct" ("<correct>/<labelled>") and "accuracy" are "n/a" for stubbed runs.
+    """
+    def average(values: list) -> Optional[float]:
+        values = [value for value in values if value is not None]
+        return round(sum(values) / len(values), 1) if values else None
+
+    summary = {}
+    for variant_name in dict.fromkeys(row["variant"] for row in rows):
+        variant_rows = [row for row in rows if row["variant"] == variant_name]
+        labelled = [row for row in variant_rows if row["expected"]]
+        correct = sum(row["status"] == row["expected"] for row in labelled)
+        stubbed = any(row.get("stubbed") for row in variant_rows)
+
+        summary[variant_name] = {
+            "runs": len(variant_rows),
+            "valid": sum(row["status"] == "valid" for row in variant_rows),
+            "correct": "n/a" if stubbed or not labelled else f"{correct}/{len(labelled)}",
+            "accuracy": "n/a" if stubbed or not labelled else round(correct / len(labelled), 3),
+            "avg_input_tokens": average([counted_input_tokens(row) for row in variant_rows]),
+            "avg_prompt_tokens": average([row["token_usage"]["prompt_tokens"] for row in variant_rows]),
+            "avg_latency_ms": average([row["token_usage"]["latency_ms"] for row in variant_rows])
+        }
+    return summary
+
+
+def print_report(summary: dict):
+    """Prints the per-variant summary as a table, cheapest variant first."""
+    columns = ["runs", "valid", "correct", "accuracy", "avg_input_tokens", "avg_prompt_tokens", "avg_latency_ms"]
+    print(f"{'variant':<26}" + "".join(f"{column:>19}" for column in columns))
+
+    for variant_name, stats in sorted(summary.items(), key=lambda item: item[1]["avg_input_tokens"] or 0):
+        print(f"{variant_name:<26}" + "".join(f"{str(stats[column]):>19}" for column in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare OPM prompt variants on tokens, latency and outcome.")
+    parser.add_argument("--corpus", default=eval_corpus_path, help="Directory with OPM PDFs and an optional expected.json")
+    parser.add_argument("--language", default="python", help="Target language (default: python)")
+    parser.add_argument("--variants", nargs="+", choices=list(PROMPT_VARIANTS), default=list(PROMPT_VARIANTS))
+    parser.add_argument("--stub", action="store_true", help="Use the stubbed model instead of Gemini")
+    parser.add_argument("--output", help="Write the result rows to this JSON file")
+    parser.add_argument("--replay", help="Report on result rows recorded earlier with --output")
+    args = parser.parse_args()
+
+    if args.replay:
+        with open(args.replay) as f:
+            rows = json.load(f)
+    else:
+        corpus = load_corpus(args.corpus)
+        if any(variant_name.endswith("lecture_excerpt") for variant_name in args.variants):
+            build_lecture_excerpt()
+
+        rows = []
+        for variant_name in args.variants:
+            rows.extend(run_variant(variant_name, corpus, args.language, client=StubGeminiClient() if args.stub else None))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
+
+    print_report(summarize(rows))
+
+
+if __name__ == "__main__":
+    main()
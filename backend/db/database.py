@@ -1,4 +1,4 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, ASCENDING, TEXT
 from dotenv import load_dotenv
 import os
 
@@ -8,8 +8,51 @@ MONGO_URI = os.getenv("MONGO_URI")
 DB_NAME = os.getenv("MONGO_DB_NAME")
 USERS_COLLECTION_NAME = "users"
 OPM_GENERATIONS_COLLECTION_NAME = "opm_generations"
+USER_PROJECT_VERSIONS_INDEX_NAME = "user_projects_versions"
+PROJECT_VERSION_INDEX_NAME = "project_version"
 
 client = MongoClient(MONGO_URI)
 db = client[DB_NAME]
 users_collection = db[USERS_COLLECTION_NAME]
 opm_generations_collection = db[OPM_GENERATIONS_COLLECTION_NAME]
+
+
+def create_indexes():
+    """
+    Creates the opm_generations indexes (no-op for indexes that already exist).
+
+    Called from the app's startup hook, so importing this module never waits on MongoDB.
+    """
+    # Export (GET /projects/export) sorts by (created_at, generation_id), and its keyset resume filters
+    # on the same keys, so the cursor streams in index order instead of sorting documents in memory.
+    # The project list (GET /projects/) walks the same index backwards for its created_at DESC sort.
+    opm_generations_collection.create_index(
+        [("user_email", ASCENDING), ("created_at", ASCENDING), ("generation_id", ASCENDING)],
+        name="user_projects_by_created_at"
+    )
+
+    # ETag lookups only read generation_id and updated_at, so these indexes cover them:
+    # a revalidation (GET /projects/, GET /projects/{id}/pdf) never loads project bodies or PDFs
+    opm_generations_collection.create_index(
+        [("user_email", ASCENDING), ("generation_id", ASCENDING), ("updated_at", ASCENDING)],
+        name=USER_PROJECT_VERSIONS_INDEX_NAME
+    )
+    opm_generations_collection.create_index(
+        [("generation_id", ASCENDING), ("updated_at", ASCENDING)],
+        name=PROJECT_VERSION_INDEX_NAME
+    )
+
+    # Full-text search over a user's generations (used by GET /projects/search).
+    # user_email is an equality prefix, so every search only scans that user's index keys.
+    # MongoDB keeps the index up to date on insert/update/delete.
+    opm_generations_collection.create_index(
+        [
+            ("user_email", ASCENDING),
+            ("pdf_filename", TEXT),
+            ("ai_generated_code", TEXT),
+            ("ai_explanation", TEXT)
+        ],
+        name="user_projects_text_search",
+        weights={"pdf_filename": 10, "ai_explanation": 5, "ai_generated_code": 1},
+        default_language="english"
+    )
@@ -3,4 +3,7 @@ import os
 root_path = os.path.dirname(os.path.abspath(__file__))
 
 opm_manual_pdf_path = os.path.join(root_path, "assets", "OPM Manual.pdf")
-opm_lecture_pdf_path = os.path.join(root_path, "assets", "OPM Lecture.pdf")
\ No newline at end of file
+opm_lecture_pdf_path = os.path.join(root_path, "assets", "OPM Lecture.pdf")
+
+# Labelled OPM PDFs used by the prompt evaluation harness (ai/prompt_eval.py)
+eval_corpus_path = os.path.join(root_path, "eval_corpus")
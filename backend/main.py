@@ -1,13 +1,23 @@
 import uvicorn
 import os
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from middleware.compression import CompressionMiddleware
+from db.database import create_indexes
 from routers import auth, opm, projects
 
 load_dotenv()
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    create_indexes()
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:5173")
 
@@ -19,6 +29,9 @@ app.add_middleware(
     allow_headers=["*"], # allow any header
 )
 
+# brotli/gzip for JSON bodies (project lists, generated code) larger than 1 KB
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
 app.include_router(auth.router)
 app.include_router(opm.router)
 app.include_router(projects.router)
@@ -0,0 +1,79 @@
+# Built on Starlette's gzip responders (IdentityResponder, send_with_compression,
+# content_type_is_excluded), which are private API. This ties the module to the pinned
+# starlette==0.49.3 in requirements.txt; re-check it whenever Starlette is upgraded.
+import brotli
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipResponder, IdentityResponder
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+# CONSTANTS
+# PDFs and zip archives are already compressed, compressing them again only costs CPU
+ALREADY_COMPRESSED_CONTENT_TYPES = ("application/pdf", "application/zip")
+
+
+class SkipCompressedMixin:
+    """Marks responses whose content type is already compressed as excluded from compression."""
+    async def send_with_compression(self, message: Message) -> None:
+        await super().send_with_compression(message)
+
+        if message["type"] == "http.response.start":
+            content_type = Headers(raw=message["headers"]).get("content-type", "")
+            if content_type.startswith(ALREADY_COMPRESSED_CONTENT_TYPES):
+                self.content_type_is_excluded = True
+
+
+class BrotliResponder(SkipCompressedMixin, IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int) -> None:
+        super().__init__(app, minimum_size)
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        compressed = self.compressor.process(body)
+        if not more_body:
+            compressed += self.compressor.finish()
+        return compressed
+
+
+class SelectiveGZipResponder(SkipCompressedMixin, GZipResponder):
+    pass
+
+
+class SelectiveIdentityResponder(SkipCompressedMixin, IdentityResponder):
+    pass
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses with brotli or gzip, according to the client's Accept-Encoding.
+
+    - Brotli is preferred over gzip when the client accepts both.
+    - Responses smaller than minimum_size are sent as is.
+    - PDFs and zip archives are never compressed.
+    """
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accepted_encodings = {
+            encoding.split(";")[0].strip().lower()
+            for encoding in Headers(scope=scope).get("Accept-Encoding", "").split(",")
+        }
+
+        if "br" in accepted_encodings:
+            responder = BrotliResponder(self.app, self.minimum_size, quality=self.brotli_quality)
+        elif "gzip" in accepted_encodings:
+            responder = SelectiveGZipResponder(self.app, self.minimum_size, compresslevel=self.gzip_level)
+        else:
+            responder = SelectiveIdentityResponder(self.app, self.minimum_size)
+
+        await responder(scope, receive, send)
@@ -105,6 +105,7 @@ async def generate_code(
         )
 
     ai_result["filename"] = output_filename
+    token_usage = ai_result.pop("token_usage", None)  # stored with the generation, not returned
 
     # -------- SAVE TO DATABASE IF VALID --------
     if ai_result.get("status") == "valid":
@@ -120,6 +121,7 @@ async def generate_code(
             "output_filename": output_filename,
             "ai_generated_code": ai_result.get("code"),
             "ai_explanation": ai_result.get("explanation"),
+            "token_usage": token_usage,
             "created_at": current_time,
             "updated_at": current_time
         }
@@ -188,6 +190,8 @@ async def refine_code(
             detail=f"Failed to refine code: {str(e)}"
         )
 
+    token_usage = ai_result.pop("token_usage", None)  # stored with the generation, not returned
+
     # -------- UPDATE DATABASE IF VALID --------
     if ai_result.get("status") == "valid":
         update_result = opm_generations_collection.update_one(
@@ -196,6 +200,7 @@ async def refine_code(
                 "$set": {
                     "ai_generated_code": ai_result.get("code"),
                     "ai_explanation": ai_result.get("explanation"),
+                    "token_usage": token_usage,  # usage of the latest refinement
                     "updated_at": datetime.now(timezone.utc)
                 }
             }
@@ -1,31 +1,256 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse, StreamingResponse
-from db.database import opm_generations_collection
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from db.database import opm_generations_collection, USER_PROJECT_VERSIONS_INDEX_NAME, PROJECT_VERSION_INDEX_NAME
+from routers.opm import language_to_filename
+from datetime import datetime
+from typing import Optional
+import hashlib
 import io
+import os
+import re
+import zipfile
 
 router = APIRouter(
     prefix="/projects",
     tags=["User Projects"]
 )
 
+# CONSTANTS
+EXPORT_BATCH_SIZE = 20  # documents fetched per cursor round-trip (each may hold a PDF of up to 10 MB)
+MAX_SEARCH_PAGE_SIZE = 100
+SNIPPET_RADIUS = 60  # characters shown on each side of the first match
+STEM_SUFFIXES = ("ing", "ed", "es", "er", "ly", "s", "e")  # longest first
+SEARCHABLE_FIELDS = ("pdf_filename", "ai_explanation", "ai_generated_code")
+PROJECTS_CACHE_CONTROL = "private, no-cache"  # always revalidate, unchanged lists cost a 304
+PDF_CACHE_CONTROL = "private, max-age=3600"
+
+
+# HELPER FUNCTIONS
+class _ZipChunkBuffer(io.RawIOBase):
+    """
+    Write-only, non-seekable sink for zipfile.
+
+    zipfile writes the archive into this buffer, and the export generator drains
+    it after every entry, so only the current entry is ever held in memory.
+    """
+    def __init__(self):
+        super().__init__()
+        self._chunks = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.extend(data)
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = bytes(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def archive_pdf_filename(pdf_filename: Optional[str]) -> str:
+    """
+    Returns a safe zip entry name for an uploaded PDF.
+
+    pdf_filename is client-supplied, so any directory part is dropped to keep
+    the entry inside its project folder.
+    """
+    name = os.path.basename((pdf_filename or "").replace("\\", "/"))
+    if name in ("", ".", ".."):
+        return "diagram.pdf"
+    return name
+
+
+def iter_projects_zip(cursor):
+    """
+    Builds a zip archive from a Mongo cursor, yielding it chunk by chunk.
+
+    Every project becomes a folder "<created_at>_<generation_id>/" containing
+    the original PDF, the generated source file (named per language_to_filename)
+    and the AI explanation.
+
+    :param cursor: Cursor over opm_generations documents
+    :return: Generator of zip archive bytes
+    """
+    buffer = _ZipChunkBuffer()
+
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for project in cursor:
+            folder = f'{project["created_at"]:%Y-%m-%dT%H-%M-%S}_{project["generation_id"]}'
+            code_filename = language_to_filename.get(
+                project.get("target_language"),
+                project.get("output_filename", "code.txt")
+            )
+
+            if "pdf_file" in project:
+                archive.writestr(
+                    f'{folder}/{archive_pdf_filename(project.get("pdf_filename"))}',
+                    bytes(project["pdf_file"]),
+                    compress_type=zipfile.ZIP_STORED
+                )
+            archive.writestr(f"{folder}/{code_filename}", project.get("ai_generated_code") or "")
+            archive.writestr(f"{folder}/explanation.txt", project.get("ai_explanation") or "")
+
+            yield buffer.drain()
+
+    # Central directory is written when the archive is closed
+    yield buffer.drain()
+
+
+def build_etag(versions: list) -> str:
+    """
+    Builds a weak ETag from (generation_id, updated_at) pairs.
+
+    Weak, because the compression middleware may change the bytes on the wire.
+    """
+    digest = hashlib.sha1()
+    for generation_id, updated_at in sorted(versions):
+        digest.update(f"{generation_id}:{updated_at.isoformat()};".encode())
+    return f'W/"{digest.hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Checks the request's If-None-Match header against etag (weak comparison)."""
+    if_none_match = request.headers.get("If-None-Match")
+    if not if_none_match:
+        return False
+
+    if if_none_match.strip() == "*":
+        return True
+
+    def strip_weak(tag: str) -> str:
+        return tag.strip().removeprefix("W/")
+
+    return strip_weak(etag) in {strip_weak(tag) for tag in if_none_match.split(",")}
+
+
+def extract_search_terms(query: str) -> list:
+    """
+    Extracts the terms to highlight from a MongoDB $text search string.
+
+    Quoted phrases are kept whole, negated terms (-word, -"some phrase") are dropped
+    and stray quotes (e.g. from an unterminated phrase) are removed.
+    """
+    terms = []
+    # Negated phrases must be matched before plain words, which would split them on spaces
+    for phrase, word in re.findall(r'-"[^"]*"|"([^"]+)"|(\S+)', query):
+        term = (phrase or word).replace('"', "").strip()
+        if term and not (word and word.startswith("-")):
+            terms.append(term)
+    return terms
+
+
+def stem_word(word: str) -> str:
+    """
+    Crude English stemmer for highlighting ("running" -> "run", "generate" -> "generat").
+
+    $text matches stemmed words, so highlights match on the stem plus any word ending.
+    """
+    word = word.lower()
+    for suffix in STEM_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            break
+
+    # "runn" -> "run"
+    if len(word) > 3 and word[-1] == word[-2] and word[-1] not in "aeiouslz":
+        word = word[:-1]
+    return word
+
+
+def build_highlight_pattern(terms: list) -> Optional[re.Pattern]:
+    """
+    Builds a case-insensitive regex matching any search term by word stems.
+
+    Phrases match their words in order, separated by any non-word characters.
+    Words shorter than 3 characters (e.g. the "c" of "c++") only match whole words.
+    """
+    def word_pattern(word: str) -> str:
+        if len(word) < 3:
+            return re.escape(word) + r"\b"
+        return re.escape(stem_word(word)) + r"\w*"
+
+    alternatives = []
+    for term in terms:
+        words = re.findall(r"\w+", term)
+        if words:
+            alternatives.append(r"\b" + r"\W+".join(word_pattern(word) for word in words))
+
+    if not alternatives:
+        return None
+    return re.compile("|".join(alternatives), re.IGNORECASE)
+
+
+def build_snippet(text: str, pattern: Optional[re.Pattern]) -> Optional[dict]:
+    """
+    Builds a short snippet around the first match of the highlight pattern.
+
+    :param text: Field value to search in
+    :param pattern: Output of build_highlight_pattern
+    :return:
+    None if the pattern does not occur in the text, otherwise:
+    {
+        "snippet": text excerpt around the first match,
+        "highlights": list of [start, end] offsets of matches inside the snippet
+    }
+    """
+    if not text or not pattern:
+        return None
+
+    first_match = pattern.search(text)
+    if not first_match:
+        return None
+
+    start = max(first_match.start() - SNIPPET_RADIUS, 0)
+    end = min(first_match.end() + SNIPPET_RADIUS, len(text))
+    snippet = text[start:end]
+
+    return {
+        "snippet": snippet,
+        "highlights": [[match.start(), match.end()] for match in pattern.finditer(snippet)]
+    }
+
+
 @router.get("/")
-async def get_user_projects(user_email: str):
+async def get_user_projects(request: Request, user_email: str):
     """
     Get all OPM generations for a specific user.
 
+    :param request: Incoming request (for If-None-Match)
     :param user_email: Email of the user (identifier)
     :return: List of projects (without the binary PDF data for performance)
+
+    Notes:
+    - The ETag covers every project's generation_id and updated_at, so it changes on any
+      insert, refinement or deletion. A matching If-None-Match returns 304 without loading the projects.
     """
     try:
+        versions = [
+            (project["generation_id"], project["updated_at"])
+            for project in opm_generations_collection.find(
+                {"user_email": user_email},
+                {"_id": 0, "generation_id": 1, "updated_at": 1}
+            ).hint(USER_PROJECT_VERSIONS_INDEX_NAME)  # covered query, reads the index only
+        ]
+        etag = build_etag(versions)
+        cache_headers = {"ETag": etag, "Cache-Control": PROJECTS_CACHE_CONTROL}
+
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers=cache_headers)
+
         projects = list(opm_generations_collection.find(
             {"user_email": user_email},
             {
                 "_id": 0,
-                "pdf_file": 0  # Exclude binary data for list view
+                "pdf_file": 0,  # Exclude binary data for list view
+                "token_usage": 0  # Internal prompt accounting
             }
         ).sort("created_at", -1))  # Most recent first
 
-        return projects
+        return JSONResponse(content=jsonable_encoder(projects), headers=cache_headers)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -33,26 +258,184 @@ async def get_user_projects(user_email: str):
         )
 
 
+@router.get("/search")
+async def search_user_projects(user_email: str, q: str, page: int = 1, page_size: int = 20):
+    """
+    Full-text search over a user's OPM generations.
+
+    Searches pdf_filename, ai_generated_code and ai_explanation using the MongoDB text index,
+    ranked by relevance (filename matches weigh most, then explanation, then code).
+
+    :param user_email: Email of the user (identifier)
+    :param q: Search string (MongoDB $text syntax: words, "exact phrases", -excluded)
+    :param page: 1-based page number
+    :param page_size: Number of results per page (max MAX_SEARCH_PAGE_SIZE)
+    :return:
+    JSON response with:
+    {
+        "total": number of matching projects,
+        "page": page,
+        "page_size": page_size,
+        "results": projects (without the binary PDF data), each with
+                   "score" and "snippets" ({field: {"snippet", "highlights"}})
+    }
+    """
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Search query is required")
+
+    if page < 1 or not 1 <= page_size <= MAX_SEARCH_PAGE_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"page must be >= 1 and page_size between 1 and {MAX_SEARCH_PAGE_SIZE}"
+        )
+
+    query = {"user_email": user_email, "$text": {"$search": q}}
+
+    try:
+        total = opm_generations_collection.count_documents(query)
+        cursor = opm_generations_collection.find(
+            query,
+            {
+                "_id": 0,
+                "pdf_file": 0,  # Exclude binary data for list view
+                "token_usage": 0,  # Internal prompt accounting
+                "score": {"$meta": "textScore"}
+            }
+        ).sort([("score", {"$meta": "textScore"}), ("created_at", -1)])  # Most relevant first
+        projects = list(cursor.skip((page - 1) * page_size).limit(page_size))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to search projects: {str(e)}"
+        )
+
+    pattern = build_highlight_pattern(extract_search_terms(q))
+    for project in projects:
+        project["snippets"] = {}
+        for field in SEARCHABLE_FIELDS:
+            snippet = build_snippet(project.get(field), pattern)
+            if snippet:
+                project["snippets"][field] = snippet
+
+        # The stem regex can still miss a $text match (e.g. irregular stems),
+        # so every result falls back to the start of its first non-empty field
+        if not project["snippets"]:
+            for field in SEARCHABLE_FIELDS:
+                if project.get(field):
+                    project["snippets"][field] = {"snippet": project[field][:2 * SNIPPET_RADIUS], "highlights": []}
+                    break
+
+    return {
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "results": projects
+    }
+
+
+@router.get("/export")
+async def export_user_projects(
+        user_email: str,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        after_generation_id: Optional[str] = None
+):
+    """
+    Export all OPM generations of a user as a streamed zip archive.
+
+    Projects are read with a server-side cursor and written to the archive one at a time,
+    so memory usage does not grow with the number of projects.
+
+    :param user_email: Email of the user (identifier)
+    :param created_from: Only export projects created at or after this time (optional)
+    :param created_to: Only export projects created before this time (optional)
+    :param after_generation_id: Only export projects that come after this one in export order (optional)
+    :return: Zip file as streaming response
+
+    Notes:
+    - Projects are exported oldest first, ordered by (created_at, generation_id).
+      To resume an interrupted export, call again with after_generation_id set to the
+      generation_id of the last folder that was fully received ("<created_at>_<generation_id>/").
+    - Returns 404 if after_generation_id is not one of the user's projects.
+    """
+    conditions: list = [{"user_email": user_email}]
+
+    created_at_range: dict = {}
+    if created_from:
+        created_at_range["$gte"] = created_from
+    if created_to:
+        created_at_range["$lt"] = created_to
+    if created_at_range:
+        conditions.append({"created_at": created_at_range})
+
+    if after_generation_id:
+        last_exported = opm_generations_collection.find_one(
+            {"generation_id": after_generation_id, "user_email": user_email},
+            {"created_at": 1}
+        )
+
+        if not last_exported:
+            raise HTTPException(
+                status_code=404,
+                detail="Project to resume after not found"
+            )
+
+        # Keyset pagination on the export sort order
+        conditions.append({"$or": [
+            {"created_at": {"$gt": last_exported["created_at"]}},
+            {"created_at": last_exported["created_at"], "generation_id": {"$gt": after_generation_id}}
+        ]})
+
+    query: dict = conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+    cursor = opm_generations_collection.find(
+        query,
+        {"_id": 0}
+    ).sort([("created_at", 1), ("generation_id", 1)]).batch_size(EXPORT_BATCH_SIZE)
+
+    return StreamingResponse(
+        iter_projects_zip(cursor),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": 'attachment; filename="opm_projects.zip"'
+        }
+    )
+
+
 @router.get("/{generation_id}/pdf")
-async def get_pdf_by_id(generation_id: str):
+async def get_pdf_by_id(request: Request, generation_id: str):
     """
     Get the PDF diagram of a specific project.
 
+    :param request: Incoming request (for If-None-Match)
     :param generation_id: Unique ID of the generation
-    :return: PDF file as streaming response
+    :return: PDF file as streaming response, or 304 if the client's copy is current
     """
-    project = opm_generations_collection.find_one(
+    version = opm_generations_collection.find_one(
         {"generation_id": generation_id},
-        {"pdf_file": 1, "pdf_filename": 1}
+        {"_id": 0, "updated_at": 1},
+        hint=PROJECT_VERSION_INDEX_NAME  # covered query, reads the index only
     )
 
-    if not project:
+    if not version:
         raise HTTPException(
             status_code=404,
             detail="Project not found"
         )
 
-    if "pdf_file" not in project:
+    etag = build_etag([(generation_id, version["updated_at"])])
+    cache_headers = {"ETag": etag, "Cache-Control": PDF_CACHE_CONTROL}
+
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=cache_headers)
+
+    # Only load the binary PDF once we know it has to be sent
+    project = opm_generations_collection.find_one(
+        {"generation_id": generation_id},
+        {"pdf_file": 1, "pdf_filename": 1}
+    )
+
+    if not project or "pdf_file" not in project:
         raise HTTPException(
             status_code=404,
             detail="PDF file not found for this project"
@@ -64,7 +447,8 @@ async def get_pdf_by_id(generation_id: str):
         io.BytesIO(pdf_bytes),
         media_type="application/pdf",
         headers={
-            "Content-Disposition": f'attachment; filename="{project["pdf_filename"]}"'
+            "Content-Disposition": f'attachment; filename="{project["pdf_filename"]}"',
+            **cache_headers
         }
     )
 
@@ -11,6 +11,8 @@ export const ENDPOINTS = {
 
   // Projects endpoints
   GET_USER_PROJECTS: "/projects",
+  SEARCH_USER_PROJECTS: "/projects/search",
+  EXPORT_USER_PROJECTS: "/projects/export",
   GET_PDF_BY_ID: (generationId) => `/projects/${generationId}/pdf`,
   DELETE_PROJECT: (generationId) => `/projects/${generationId}`
 };
@@ -34,6 +34,50 @@ export const getPdfById = async (generationId) => {
 };
 
 
+/**
+ * Full-text search over a user's projects
+ * @param {string} userEmail - The email of the logged-in user
+ * @param {string} query - Search string
+ * @param {number} [page=1] - 1-based page number
+ * @param {number} [pageSize=20] - Results per page
+ * @returns {Promise} { total, page, page_size, results }
+ */
+export const searchUserProjects = async (userEmail, query, page = 1, pageSize = 20) => {
+  try {
+    const res = await api.get(ENDPOINTS.SEARCH_USER_PROJECTS, {
+      params: { user_email: userEmail, q: query, page, page_size: pageSize }
+    });
+    return res.data;
+  } catch (err) {
+    throw err.response?.data || { detail: "Failed to search projects" };
+  }
+};
+
+
+/**
+ * Download all projects of a user as a zip archive.
+ * The browser navigates to the export URL and streams the archive straight to disk,
+ * so large exports are never held in memory and a partial download keeps the folders received so far.
+ * @param {string} userEmail - The email of the logged-in user
+ * @param {string} [createdFrom] - ISO date, only export projects created at or after it
+ * @param {string} [createdTo] - ISO date, only export projects created before it
+ * @param {string} [afterGenerationId] - Resume after this project (last folder fully received)
+ */
+export const exportUserProjects = (userEmail, createdFrom, createdTo, afterGenerationId) => {
+  const params = new URLSearchParams({ user_email: userEmail });
+  if (createdFrom) params.append("created_from", createdFrom);
+  if (createdTo) params.append("created_to", createdTo);
+  if (afterGenerationId) params.append("after_generation_id", afterGenerationId);
+
+  const link = document.createElement("a");
+  link.href = `${api.defaults.baseURL}${ENDPOINTS.EXPORT_USER_PROJECTS}?${params}`;
+  link.download = "opm_projects.zip";
+  document.body.appendChild(link);
+  link.click();
+  link.remove();
+};
+
+
 /**
  * Delete a specific project
  * @param {string} generationId - The unique generation ID